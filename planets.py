@@ -1,29 +1,154 @@
+from contextlib import contextmanager
 from math import pi, radians
-from random import random
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import bmesh
 import bpy
+from mathutils import Matrix
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    # (numba isn't bundled with Blender: fall back
+    # to running the plain Python/numpy functions)
+    njit = None
 
 
-def setup_render_settings(output_path, test_render=False):
-    bpy.context.scene.render.engine = 'BLENDER_EEVEE'
-    bpy.context.scene.render.image_settings.file_format = 'FFMPEG'
-    bpy.context.scene.render.ffmpeg.format = 'MPEG4'
-    bpy.context.scene.render.ffmpeg.codec = 'H264'
-    bpy.context.scene.render.ffmpeg.constant_rate_factor = 'MEDIUM'
-    bpy.context.scene.render.filepath = output_path
+def enable_cycles_devices(device_type):
+    # select the Cycles compute device type and enable all its
+    # GPU devices (and only those); these are user preferences,
+    # they aren't saved in the .blend file. Return whether a
+    # GPU device was found (raise TypeError if the build
+    # doesn't support this device type)
+    prefs = bpy.context.preferences.addons['cycles'].preferences
+    prefs.compute_device_type = device_type
+    prefs.refresh_devices()
+    for d in prefs.devices:
+        d.use = (d.type != 'CPU')
+    return any(d.use for d in prefs.devices)
+
+def setup_gpu_rendering(scene):
+    # switch to Cycles on the GPU, trying OptiX, then CUDA,
+    # then HIP; return the compute device type that was
+    # picked (or None if no GPU device is available, in which
+    # case the user's Cycles preferences are left as they were)
+    prefs = bpy.context.preferences.addons['cycles'].preferences
+    device_type_before = prefs.compute_device_type
+    use_before = {d.id: d.use for d in prefs.devices}
+    picked = None
+    try:
+        for device_type in ('OPTIX', 'CUDA', 'HIP'):
+            try:
+                found = enable_cycles_devices(device_type)
+            except TypeError:
+                # (this backend is not supported by the build)
+                continue
+            if found:
+                picked = device_type
+                break
+    finally:
+        if picked is None:
+            prefs.compute_device_type = device_type_before
+            for d in prefs.devices:
+                if d.id in use_before:
+                    d.use = use_before[d.id]
+    if picked is not None:
+        scene.render.engine = 'CYCLES'
+        scene.cycles.device = 'GPU'
+        # (match the EEVEE render samples, instead of the
+        # Cycles default of 4096: the scene is emission only
+        # and converges quickly)
+        scene.cycles.samples = 64
+        scene.cycles.use_adaptive_sampling = True
+    return picked
+
+def setup_render_settings(output_path, test_render=False, enable_gpu=False):
+    scene = bpy.context.scene
+    render = scene.render
+    ffmpeg = render.ffmpeg
+    render.engine = 'BLENDER_EEVEE'
+    gpu_device = None
+    if enable_gpu:
+        try:
+            gpu_device = setup_gpu_rendering(scene)
+        except Exception as e:
+            print("GPU setup failed ({}), using EEVEE".format(e))
+            gpu_device = None
+        if gpu_device is None:
+            render.engine = 'BLENDER_EEVEE'
+    render.image_settings.file_format = 'FFMPEG'
+    ffmpeg.format = 'MPEG4'
+    ffmpeg.codec = 'H264'
+    ffmpeg.constant_rate_factor = 'MEDIUM'
+    render.filepath = output_path
 
     if test_render:
         # Lower resolution for faster test renders
-        bpy.context.scene.render.resolution_x = 960  # Half of 1920
-        bpy.context.scene.render.resolution_y = 540   # Half of 1080
-        bpy.context.scene.render.resolution_percentage = 50  # Or set to 100 for full scale at reduced resolution
+        render.resolution_x = 960  # Half of 1920
+        render.resolution_y = 540   # Half of 1080
+        render.resolution_percentage = 50  # Or set to 100 for full scale at reduced resolution
+        # Fewer samples and no bloom for faster test renders
+        eevee = scene.eevee
+        eevee.taa_render_samples = 16  # Default is 64
+        eevee.taa_samples = 4  # Viewport samples
+        eevee.use_bloom = False
+        if render.engine == 'CYCLES':
+            scene.cycles.samples = 16
+        # Draw the rendered viewport with 2x2 pixels (the "2x"
+        # pixel size: much faster interactive previews)
+        render.preview_pixel_size = '2'
+        # Cheapest (fastest) encoding for the previews
+        ffmpeg.constant_rate_factor = 'LOWEST'
+        ffmpeg.ffmpeg_preset = 'REALTIME'
     else:
         # Full resolution for final render
-        bpy.context.scene.render.resolution_x = 1920
-        bpy.context.scene.render.resolution_y = 1080
-        bpy.context.scene.render.resolution_percentage = 100
+        render.resolution_x = 1920
+        render.resolution_y = 1080
+        render.resolution_percentage = 100
+
+    render.fps = 24
+
+    return gpu_device
 
-    bpy.context.scene.render.fps = 24
 
+def add_keyframes(fcurve, points, interpolation=None):
+    # allocate all the keyframes at once and write their
+    # (frame, value) coordinates directly, instead of
+    # inserting them one by one through the RNA path
+    fcurve.keyframe_points.add(len(points))
+    for k, co in zip(fcurve.keyframe_points, points):
+        k.co = co
+        if interpolation is not None:
+            k.interpolation = interpolation
+    # (sort the keyframes + recompute the handles)
+    fcurve.update()
+
+def reset_action(id_data, action_name):
+    # return the action animating id_data, emptied of its
+    # f-curves (so that running the script again doesn't
+    # leave orphan actions behind); create it if needed
+    id_data.animation_data_create()
+    action = id_data.animation_data.action
+    if action is None:
+        action = bpy.data.actions.new(action_name)
+        id_data.animation_data.action = action
+    else:
+        action.fcurves.clear()
+    return action
+
+def reuse_action(action_name):
+    # return the action with that name (left over by a
+    # previous run, once its object got deleted) emptied of
+    # its f-curves, or a new one
+    action = bpy.data.actions.get(action_name)
+    if action is None:
+        return bpy.data.actions.new(action_name)
+    action.fcurves.clear()
+    return action
 
 def adjust_camera_clipping(camera, clip_start=0.1, clip_end=1000):
     camera.data.clip_start = clip_start  # Minimum distance to render objects
@@ -37,9 +162,6 @@ def setup_and_animate_camera(start_frame, end_frame, start_location, end_locatio
         camera = bpy.context.active_object
     else:
         camera = bpy.data.objects["Camera"]
-        # Explicitly set the camera as the active object
-        bpy.context.view_layer.objects.active = camera
-        camera.select_set(True)
 
     camera.location = start_location
     camera.rotation_euler = (radians(65), 0, radians(67))
@@ -48,47 +170,157 @@ def setup_and_animate_camera(start_frame, end_frame, start_location, end_locatio
     # Use this function after creating or selecting the camera, with appropriate clipping distances
     adjust_camera_clipping(bpy.data.objects['Camera'], clip_start=0.1, clip_end=5000)
 
-    # Insert keyframes for start position and lens
-    camera.keyframe_insert(data_path="location", frame=start_frame)
-    camera.data.keyframe_insert(data_path="lens", frame=start_frame)
-    
-    # Update camera location and lens for the end position
-    camera.location = end_location
-    camera.data.lens = end_lens  # Adjust the lens for the end
-    
-    # Insert keyframes for end position and lens
-    camera.keyframe_insert(data_path="location", frame=end_frame)
-    camera.data.keyframe_insert(data_path="lens", frame=end_frame)
+    # Insert keyframes for start and end position (x, y, z)
+    action = reset_action(camera, "CamAction")
+    for i in range(3):
+        add_keyframes(
+            action.fcurves.new("location", index=i),
+            [(start_frame, start_location[i]), (end_frame, end_location[i])]
+        )
+
+    # Insert keyframes for start and end lens (on the camera data)
+    lens_action = reset_action(camera.data, "CamLensAction")
+    add_keyframes(
+        lens_action.fcurves.new("lens"),
+        [(start_frame, start_lens), (end_frame, end_lens)]
+    )
 
 
-def create_sphere(radius, distance_to_sun, obj_name):
+PLANET_PARAMS_DTYPE = np.dtype([
+    ('r', 'f4'), ('d', 'f4'), ('cr', 'f4'), ('cg', 'f4'), ('rot', 'f4')
+])
+
+def planet_params_from_uniforms(n_planets, u):
+    # compute the parameters of all the planets at once
+    # from u, an array of (n_planets, 5) random floats in [0, 1)
+    # get a random radius (a float in [1, 5])
+    r = 1 + u[:, 0] * 4
+    # get a random distace to the origin point:
+    # - an initial offset of 30 to get out of the sun's sphere
+    # - a shift depending on the index of the planet
+    # - a little "noise" with a random float
+    d = 30 + np.arange(n_planets) * 12 + (u[:, 1] * 4 - 2)
+    # get a random color (red and green components)
+    col = u[:, 2:4]
+    # get a random final rotation angle (in [2pi, 4pi])
+    rot = (2 + u[:, 4] * 2) * np.pi
+    return r, d, col, rot
+
+if njit is not None:
+    # (numba can only cache the compiled code of a script
+    # that is a real file, not e.g. a Text Editor block)
+    _NUMBA_CACHE = os.path.isfile(globals().get("__file__", ""))
+    _planet_params_from_uniforms = njit(cache=_NUMBA_CACHE)(planet_params_from_uniforms)
+
+    @njit(cache=_NUMBA_CACHE)
+    def draw_planet_params(n_planets, seed):
+        # draw the random parameters of all the planets
+        # (compiled: numba's random state is its own, seeding
+        # it doesn't touch numpy's global generator)
+        np.random.seed(seed)
+        return _planet_params_from_uniforms(n_planets, np.random.random((n_planets, 5)))
+else:
+    def draw_planet_params(n_planets, seed):
+        # draw the random parameters of all the planets
+        # (with a local generator, numpy's global one is left as is)
+        rng = np.random.RandomState(seed)
+        return planet_params_from_uniforms(n_planets, rng.random_sample((n_planets, 5)))
+
+def generate_planet_params(n_planets, seed=None):
+    # pack the random planet parameters into one record
+    # per planet
+    if seed is None:
+        seed = int.from_bytes(os.urandom(4), "little")
+    r, d, col, rot = draw_planet_params(n_planets, seed)
+    params = np.empty((n_planets,), dtype=PLANET_PARAMS_DTYPE)
+    params['r'] = r
+    params['d'] = d
+    params['cr'] = col[:, 0]
+    params['cg'] = col[:, 1]
+    params['rot'] = rot
+    return params
+
+def create_sphere_template_mesh(material, u_segments=32, v_segments=16):
+    # build a unit UV sphere once with bmesh (no operator,
+    # no context/undo push) and store it in a mesh datablock
+    # that is shared by all the spheres in the scene
+    mesh = bpy.data.meshes.new("PlanetMesh")
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(
+        bm,
+        u_segments=u_segments,
+        v_segments=v_segments,
+        radius=1.0
+    )
+    bm.to_mesh(mesh)
+    bm.free()
+    # apply smooth shading (once, for all users of the mesh)
+    for p in mesh.polygons:
+        p.use_smooth = True
+    # (all the spheres use the same material too)
+    mesh.materials.append(material)
+    return mesh
+
+def create_sphere(mesh, radius, distance_to_sun, obj_name, collection):
     # instantiate a UV sphere with a given
     # radius, at a given distance from the
-    # world origin point
-    obj = bpy.ops.mesh.primitive_uv_sphere_add(
-        radius=radius,
-        location=(distance_to_sun, 0, 0),
-        scale=(1, 1, 1)
-    )
-    # rename the object
-    bpy.context.object.name = obj_name
-    # apply smooth shading
-    bpy.ops.object.shade_smooth()
+    # world origin point (the mesh data is shared,
+    # only the object transform differs)
+    obj = bpy.data.objects.new(obj_name, mesh)
+    obj.scale = (radius,) * 3
+    obj.location = (distance_to_sun, 0, 0)
+    collection.objects.link(obj)
     # return the object reference
-    return bpy.context.object
-
-def create_torus(radius, obj_name):
-    # (same as the create_sphere method)
-    obj = bpy.ops.mesh.primitive_torus_add(
-        location=(0, 0, 0),
-        major_radius=radius,
-        minor_radius=0.1,
-        major_segments=60
-    )
-    bpy.context.object.name = obj_name
+    return obj
+
+def create_orbit(planet, obj_name, collection):
+    # add an empty at the world origin and parent the
+    # planet to it: rotating the empty makes the planet
+    # revolve around the sun (the shared mesh data can't
+    # be shifted to move the planet's origin)
+    orbit = bpy.data.objects.new(obj_name, None)
+    collection.objects.link(orbit)
+    planet.parent = orbit
+    planet.matrix_parent_inverse = Matrix.Identity(4)
+    return orbit
+
+def torus_geometry(major_radius, minor_radius=0.1, major_segments=60, minor_segments=12):
+    # compute the vertices and quad faces of a torus lying in
+    # the XY plane (same layout as the primitive_torus_add
+    # operator), as numpy arrays
+    u = np.linspace(0, 2 * pi, major_segments, endpoint=False)
+    v = np.linspace(0, 2 * pi, minor_segments, endpoint=False)
+    uu, vv = np.meshgrid(u, v, indexing='ij')
+    rr = major_radius + minor_radius * np.cos(vv)
+    verts = np.stack(
+        (rr * np.cos(uu), rr * np.sin(uu), minor_radius * np.sin(vv)),
+        axis=-1
+    ).reshape(-1, 3)
+    # (vertex (i, j) is at index i * minor_segments + j)
+    i = np.arange(major_segments)[:, None]
+    j = np.arange(minor_segments)[None, :]
+    i1 = (i + 1) % major_segments
+    j1 = (j + 1) % minor_segments
+    faces = np.stack(
+        (i * minor_segments + j, i1 * minor_segments + j,
+         i1 * minor_segments + j1, i * minor_segments + j1),
+        axis=-1
+    ).reshape(-1, 4)
+    return verts, faces
+
+def create_torus(radius, obj_name, collection):
+    # build the torus mesh directly (no operator): each
+    # ring gets its own mesh, since scaling a shared unit
+    # torus would also scale the thickness of its tube
+    verts, faces = torus_geometry(radius)
+    mesh = bpy.data.meshes.new(obj_name)
+    mesh.from_pydata(verts.tolist(), [], faces.tolist())
     # apply smooth shading
-    bpy.ops.object.shade_smooth()
-    return bpy.context.object
+    for p in mesh.polygons:
+        p.use_smooth = True
+    obj = bpy.data.objects.new(obj_name, mesh)
+    collection.objects.link(obj)
+    return obj
 
 def create_emission_shader(color, strength, mat_name):
     # create a new material resource (with its
@@ -118,21 +350,74 @@ def create_emission_shader(color, strength, mat_name):
     # return the material reference
     return mat
 
+def create_planet_shader(mat_name):
+    # create an emission material shared by all the
+    # spheres: the color and strength are read from each
+    # object's custom properties (see set_planet_emission),
+    # so a single shader is compiled for all of them
+    mat = bpy.data.materials.new(mat_name)
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    nodes.clear()
+
+    # add the Attribute nodes (reading object properties)
+    node_color = nodes.new(type="ShaderNodeAttribute")
+    node_color.attribute_type = 'OBJECT'
+    node_color.attribute_name = "planet_color"
+    node_strength = nodes.new(type="ShaderNodeAttribute")
+    node_strength.attribute_type = 'OBJECT'
+    node_strength.attribute_name = "planet_strength"
+
+    # add the Emission and Output nodes
+    node_emission = nodes.new(type="ShaderNodeEmission")
+    node_output = nodes.new(type="ShaderNodeOutputMaterial")
+
+    # link the nodes
+    links = mat.node_tree.links
+    links.new(node_color.outputs["Color"], node_emission.inputs[0])
+    links.new(node_strength.outputs["Fac"], node_emission.inputs[1])
+    links.new(node_emission.outputs[0], node_output.inputs[0])
+
+    return mat
+
+def set_planet_emission(obj, color, strength):
+    # set the custom properties read by the shared
+    # planet material (color is an RGB triplet of
+    # Python floats: ID properties reject numpy scalars)
+    obj["planet_color"] = color
+    obj["planet_strength"] = strength
+
+def get_collection(name):
+    # find (or create) the collection with that name and
+    # make sure it is linked to the scene
+    scene_collection = bpy.context.scene.collection
+    collection = bpy.data.collections.get(name)
+    if collection is None:
+        collection = bpy.data.collections.new(name)
+    if collection.name not in scene_collection.children:
+        scene_collection.children.link(collection)
+    return collection
+
 def delete_object(name):
     # try to find the object by name
-    if name in bpy.data.objects:
-        # if it exists, select it and delete it
-        obj = bpy.data.objects[name]
-        obj.select_set(True)
-        bpy.ops.object.delete(use_global=False)
+    obj = bpy.data.objects.get(name)
+    if obj is None:
+        return None
+    # if it exists, remove it (and unlink it from
+    # all its collections) without going through
+    # the selection and the delete operator
+    data = obj.data
+    bpy.data.objects.remove(obj, do_unlink=True)
+    # return its data (mesh...), which may now be unused
+    return data
 
 def find_3dview_space():
     # Find 3D_View window and its scren space
-    area = None
-    for a in bpy.data.window_managers[0].windows[0].screen.areas:
-        if a.type == "VIEW_3D":
-            area = a
-            break
+    area = next(
+        (a for a in bpy.context.window_manager.windows[0].screen.areas
+         if a.type == "VIEW_3D"),
+        None
+    )
     return area.spaces[0] if area else bpy.context.space_data
 
 def setup_scene():
@@ -146,102 +431,231 @@ def setup_scene():
     scene.frame_start = START_FRAME
     scene.frame_end = END_FRAME
     scene.frame_current = START_FRAME
-    # get the current 3D view (among all visible windows
-    # in the workspace)
-    space = find_3dview_space()
-    # apply a "rendered" shading mode + hide all
-    # additional markers, grids, cursors...
-    space.shading.type = 'RENDERED'
-    space.overlay.show_floor = False
-    space.overlay.show_axis_x = False
-    space.overlay.show_axis_y = False
-    space.overlay.show_cursor = False
-    space.overlay.show_object_origins = False
+    # (there is no window/3D view to setup when running
+    # in background mode, e.g. "blender -b")
+    if not bpy.app.background:
+        # get the current 3D view (among all visible windows
+        # in the workspace)
+        space = find_3dview_space()
+        # apply a "rendered" shading mode + hide all
+        # additional markers, grids, cursors...
+        space.shading.type = 'RENDERED'
+        overlay = space.overlay
+        overlay.show_floor = False
+        overlay.show_axis_x = False
+        overlay.show_axis_y = False
+        overlay.show_cursor = False
+        overlay.show_object_origins = False
 
 N_PLANETS = 6
 START_FRAME = 1
 END_FRAME = 400
+OUTPUT_PATH = "video.mp4"  # Update this path
 
-# setup scene settings
-setup_scene()
 
-output_path = "video.mp4"  # Update this path
-setup_render_settings(output_path, test_render=False)
+def parse_args():
+    # (Blender leaves the arguments after "--" to the script)
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gpu", action="store_true",
+                        help="render with Cycles on the GPU (if there is one, "
+                             "else EEVEE); Cycles has no bloom, so the glow of "
+                             "the sun and planets differs from the EEVEE render")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="don't build the scene: render the I-th of N chunks "
+                             "of the frame range of the loaded .blend (e.g. on a "
+                             "render farm), into OUTPUT_DIR/part_I.mp4")
+    parser.add_argument("--output-dir", default=".",
+                        help="output folder of the --shard part (default: .)")
+    parser.add_argument("--cycles-device", metavar="TYPE",
+                        help="enable the Cycles devices of this type before "
+                             "rendering the loaded .blend (used by the workers "
+                             "of --jobs, or with --shard)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of background Blender processes rendering "
+                             "the animation in parallel (needs ffmpeg on the "
+                             "PATH to join the parts; default: 1)")
+    return parser.parse_args(argv)
 
+def shard_frame_range(shard, n_shards, start_frame, end_frame):
+    # split [start_frame, end_frame] into n_shards contiguous
+    # chunks and return the bounds of the shard-th one
+    n_frames = end_frame - start_frame + 1
+    start = start_frame + shard * n_frames // n_shards
+    end = start_frame + (shard + 1) * n_frames // n_shards - 1
+    return start, end
 
-# Update these values based on your scene's scale and desired reveal
-start_location = (20, -10, 5)  # Starting close to the sun
-end_location = (200, -80, 90)  # Ending location to reveal the entire solar system
-start_lens = 35  # Starting lens for tighter view
-end_lens = 35  # Ending lens for a wider view
+def render_range(start_frame, end_frame, output_path):
+    # render (and encode) the given frame range only
+    scene = bpy.context.scene
+    scene.frame_start = start_frame
+    scene.frame_end = end_frame
+    scene.render.filepath = output_path
+    bpy.ops.render.render(animation=True)
 
-setup_and_animate_camera(START_FRAME, END_FRAME, start_location, end_location, start_lens, end_lens)
+def render_shard(shard_spec, output_dir):
+    # render the I-th of N chunks ("I/N") of the frame
+    # range of the loaded scene
+    shard, n_shards = map(int, shard_spec.split("/"))
+    scene = bpy.context.scene
+    start, end = shard_frame_range(shard, n_shards, scene.frame_start, scene.frame_end)
+    render_range(start, end, os.path.join(output_dir, "part_{}.mp4".format(shard)))
 
-# clean scene + planet materials
-delete_object("Sun")
-for n in range(N_PLANETS):
-    delete_object("Planet-{:02d}".format(n))
-    delete_object("Radius-{:02d}".format(n))
-for m in bpy.data.materials:
-    bpy.data.materials.remove(m)
+def render_parallel(output_path, n_jobs, cycles_device=None):
+    # render the animation in n_jobs background Blender
+    # processes (one chunk of frames each) and join the
+    # parts with ffmpeg; cycles_device is the GPU device
+    # type the workers should enable (see setup_gpu_rendering)
+    scene = bpy.context.scene
+    if shutil.which("ffmpeg") is None:
+        # (check first: the parts can't be joined without it)
+        print("ffmpeg not found, rendering in a single process")
+        render_range(scene.frame_start, scene.frame_end, output_path)
+        return
+    n_jobs = min(n_jobs, scene.frame_end - scene.frame_start + 1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # (the workers render a saved copy of the scene)
+        blend_path = os.path.join(tmp_dir, "scene.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
 
-ring_mat = create_emission_shader(
-    (1, 1, 1, 1), 1, "RingMat"
-)
-for n in range(N_PLANETS):
-    # get a random radius (a float in [1, 5])
-    r = 1 + random() * 4
-    # get a random distace to the origin point:
-    # - an initial offset of 30 to get out of the sun's sphere
-    # - a shift depending on the index of the planet
-    # - a little "noise" with a random float
-    d = 30 + n * 12 + (random() * 4 - 2)
-    # instantiate the planet with these parameters
-    # and a custom object name
-    planet = create_sphere(r, d, "Planet-{:02d}".format(n))
-    planet.data.materials.append(
-        create_emission_shader(
-            (random(), random(), 1, 1),
-            2,
-            "PlanetMat-{:02d}".format(n)
+        # (the Cycles devices are user preferences, missing from
+        # the .blend: have the workers run this script to enable
+        # them before rendering)
+        worker_args, worker_args_end = [], []
+        if cycles_device is not None:
+            worker_args = ["-P", os.path.abspath(__file__)]
+            worker_args_end = ["--", "--cycles-device", cycles_device]
+
+        part_paths = []
+        processes = []
+        for shard in range(n_jobs):
+            start, end = shard_frame_range(shard, n_jobs, scene.frame_start, scene.frame_end)
+            part_path = os.path.join(tmp_dir, "part_{}.mp4".format(shard))
+            part_paths.append(part_path)
+            processes.append(subprocess.Popen(
+                [bpy.app.binary_path, "-b", blend_path, "-noaudio"]
+                + worker_args
+                + ["-s", str(start), "-e", str(end), "-o", part_path, "-a"]
+                + worker_args_end
+            ))
+        return_codes = [p.wait() for p in processes]
+        if any(return_codes):
+            raise RuntimeError("render processes failed: {}".format(return_codes))
+
+        list_path = os.path.join(tmp_dir, "parts.txt")
+        with open(list_path, "w") as f:
+            for part_path in part_paths:
+                f.write("file '{}'\n".format(part_path))
+        subprocess.run([
+            "ffmpeg", "-y", "-f", "concat", "-safe", "0",
+            "-i", list_path, "-c", "copy", output_path
+        ], check=True)
+
+@contextmanager
+def hidden_in_viewports(collection):
+    # hide the collection in the viewports while it is being
+    # filled, so that they don't redraw it for each new object;
+    # then restore its visibility (even if the block fails)
+    # and update the view layer once
+    hide_viewport = collection.hide_viewport
+    collection.hide_viewport = True
+    try:
+        yield
+    finally:
+        collection.hide_viewport = hide_viewport
+        bpy.context.view_layer.update()
+
+def build_scene(output_path, enable_gpu=False):
+    # setup scene settings
+    setup_scene()
+
+    gpu_device = setup_render_settings(output_path, test_render=False, enable_gpu=enable_gpu)
+
+
+    # Update these values based on your scene's scale and desired reveal
+    start_location = (20, -10, 5)  # Starting close to the sun
+    end_location = (200, -80, 90)  # Ending location to reveal the entire solar system
+    start_lens = 35  # Starting lens for tighter view
+    end_lens = 35  # Ending lens for a wider view
+
+    setup_and_animate_camera(START_FRAME, END_FRAME, start_location, end_location, start_lens, end_lens)
+
+    # (all the solar system objects go into their own
+    # collection, hidden in the viewports while it is built)
+    planets_coll = get_collection("Planets")
+    with hidden_in_viewports(planets_coll):
+        # clean scene + planet materials
+        old_data = [delete_object("Sun")]
+        for n in range(N_PLANETS):
+            old_data.append(delete_object("Planet-{:02d}".format(n)))
+            old_data.append(delete_object("Orbit-{:02d}".format(n)))
+            old_data.append(delete_object("Radius-{:02d}".format(n)))
+        # (snapshot the names first: don't mutate the
+        # collection while iterating over it)
+        materials = bpy.data.materials
+        for name in [m.name for m in materials]:
+            materials.remove(materials[name], do_unlink=True)
+        # (also free the meshes of the deleted spheres and
+        # rings, now without users, so they don't pile up as
+        # PlanetMesh.001, Radius-00.001... on each run; other
+        # orphan meshes in the file are left alone)
+        meshes = bpy.data.meshes
+        old_meshes = {d for d in old_data if isinstance(d, bpy.types.Mesh)}
+        for mesh in old_meshes:
+            if mesh.users == 0:
+                meshes.remove(mesh)
+
+        ring_mat = create_emission_shader(
+            (1, 1, 1, 1), 1, "RingMat"
         )
-    )
-    # add the radius ring display
-    ring = create_torus(d, "Radius-{:02d}".format(n))
-    ring.data.materials.append(ring_mat)
-
-    # set planet as active object
-    bpy.context.view_layer.objects.active = planet
-    planet.select_set(True)
-    # set object origin at world origin
-    bpy.ops.object.origin_set(type="ORIGIN_CURSOR", center="MEDIAN")
-    # setup the planet animation data
-    planet.animation_data_create()
-    planet.animation_data.action = bpy.data.actions.new(name="RotationAction")
-    fcurve = planet.animation_data.action.fcurves.new(
-        data_path="rotation_euler", index=2
-    )
-    k1 = fcurve.keyframe_points.insert(
-        frame=START_FRAME,
-        value=0
-    )
-    k1.interpolation = "LINEAR"
-    k2 = fcurve.keyframe_points.insert(
-        frame=END_FRAME,
-        value=(2 + random() * 2) * pi
-    )
-    k2.interpolation = "LINEAR"
+        planet_mat = create_planet_shader("PlanetMat")
+        sphere_mesh = create_sphere_template_mesh(planet_mat)
+        params = generate_planet_params(N_PLANETS)
+        for n, (r, d, cr, cg, rot) in enumerate(params):
+            # instantiate the planet with these parameters
+            # and a custom object name
+            planet = create_sphere(sphere_mesh, r, d, "Planet-{:02d}".format(n), planets_coll)
+            set_planet_emission(planet, (float(cr), float(cg), 1.0), 2.0)
+            # add the radius ring display
+            ring = create_torus(d, "Radius-{:02d}".format(n), planets_coll)
+            ring.data.materials.append(ring_mat)
 
-# add the sun sphere
-sun = create_sphere(12, 0, "Sun")
-sun.data.materials.append(
-    create_emission_shader(
-        (1, 0.66, 0.08, 1), 10, "SunMat"
-    )
-)
+            # parent the planet to an empty at the world origin
+            orbit = create_orbit(planet, "Orbit-{:02d}".format(n), planets_coll)
+            # setup the orbit animation data
+            orbit.animation_data_create()
+            orbit.animation_data.action = reuse_action("RotationAction-{:02d}".format(n))
+            fcurve = orbit.animation_data.action.fcurves.new(
+                data_path="rotation_euler", index=2
+            )
+            add_keyframes(
+                fcurve,
+                [(START_FRAME, 0.0), (END_FRAME, rot)],
+                interpolation="LINEAR"
+            )
+
+        # add the sun sphere
+        sun = create_sphere(sphere_mesh, 12, 0, "Sun", planets_coll)
+        set_planet_emission(sun, (1.0, 0.66, 0.08), 10.0)
 
-# Now, trigger the rendering of the animation
-bpy.ops.render.render(animation=True)
+    return gpu_device
 
-# deselect all objects
-bpy.ops.object.select_all(action='DESELECT')
+
+args = parse_args()
+if args.cycles_device:
+    # (the Cycles devices are user preferences, not saved in
+    # the .blend: enable them before it gets rendered)
+    enable_cycles_devices(args.cycles_device)
+if args.shard:
+    # the scene comes from the .blend file given to Blender:
+    # don't rebuild it (it is random!), just render our chunk
+    render_shard(args.shard, args.output_dir)
+elif args.cycles_device is None:
+    gpu_device = build_scene(OUTPUT_PATH, enable_gpu=args.gpu)
+    if args.jobs > 1:
+        # Now, trigger the rendering of the animation
+        # (split between several Blender processes)
+        render_parallel(OUTPUT_PATH, args.jobs, cycles_device=gpu_device)
+    else:
+        # Now, trigger the rendering of the animation
+        render_range(START_FRAME, END_FRAME, OUTPUT_PATH)